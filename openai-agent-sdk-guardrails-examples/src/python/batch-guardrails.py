@@ -0,0 +1,314 @@
+"""Run the math guardrails over a JSONL corpus of logged prompts and responses, for back-testing.
+
+  python batch-guardrails.py corpus.jsonl --output verdicts.jsonl [--concurrency 8] [--rate-limit 5] [--pack 10] [--stub]
+
+Each corpus line is a JSON object with an optional "id", a "prompt" that is checked with the input
+guardrail from input-guardrails.py (local pre-classifier first, LLM for prompts it doesn't reject)
+and/or a "response" that is checked with math_guardrail from output-guardrails.py.
+
+Guardrail calls run with bounded concurrency (--concurrency) and are spaced out to at most
+--rate-limit calls per second. With --pack N, up to N items are checked in a single structured
+guardrail call instead of one call per item. Per-item verdicts are written to --output, keyed by the
+record's "line" in the corpus (blank lines aren't counted) and its "id" (null if it has none), and
+aggregate latency and throughput stats are printed as JSON.
+
+--stub answers every guardrail call with a local stub model instead of the OpenAI API, so the whole
+pipeline can be tested without an API key.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import time
+
+from openai.types.responses import ResponseOutputMessage, ResponseOutputText
+from pydantic import BaseModel
+
+from agents import Agent, ModelResponse, RunContextWrapper, Runner, Usage, set_tracing_disabled
+from agents.models.interface import Model
+
+from script_utils import load_script, percentile
+
+
+input_guardrails = load_script("input-guardrails.py")
+output_guardrails = load_script("output-guardrails.py")
+
+
+### 1. Packed guardrail calls: several items checked in one structured call
+class ItemVerdict(BaseModel):
+    index: int
+    reasoning: str
+    verdict: bool
+
+
+class PackedVerdicts(BaseModel):
+    verdicts: list[ItemVerdict]
+
+
+def packed_agent(guardrail_agent: Agent, verdict_field: str) -> Agent:
+    return Agent(
+        name=f"{guardrail_agent.name} (packed)",
+        instructions=(
+            f"{guardrail_agent.instructions}\n\n"
+            "You are given a JSON list of items, each with an index and a text. Check every item "
+            "independently and return exactly one verdict per item with the same index. Set verdict "
+            f"to the value you would give {verdict_field} for that text on its own."
+        ),
+        output_type=PackedVerdicts,
+        model=guardrail_agent.model,
+    )
+
+
+async def check_packed(agent: Agent, texts: dict[int, str]) -> dict[int, ItemVerdict]:
+    items = [{"index": index, "text": text} for index, text in texts.items()]
+    result = await Runner.run(agent, json.dumps(items))
+    verdicts = result.final_output_as(PackedVerdicts).verdicts
+    return {verdict.index: verdict for verdict in verdicts if verdict.index in texts}
+
+
+### 2. A local stub model, so the batch runner can be tested without the OpenAI API
+STUB_MATH_PATTERN = re.compile(
+    r"\d|[=+^±]|\b(equation|formula|solve|algebra|calculus|derivative|integral|geometry|fraction|probability)\b",
+    re.IGNORECASE,
+)
+
+
+class StubGuardrailModel(Model):
+    """Answers guardrail calls after `latency` seconds, marking text as math if it matches a regex."""
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        await asyncio.sleep(self.latency)
+        text = input_guardrails.input_to_text(input)
+
+        if output_schema.name() == PackedVerdicts.__name__:
+            items = json.loads(text)
+            output = {"verdicts": [
+                {"index": item["index"], "reasoning": "stub", "verdict": bool(STUB_MATH_PATTERN.search(item["text"]))}
+                for item in items
+            ]}
+        else:
+            properties = output_schema.json_schema()["properties"]
+            verdict_field = next(name for name, spec in properties.items() if spec.get("type") == "boolean")
+            output = {"reasoning": "stub", verdict_field: bool(STUB_MATH_PATTERN.search(text))}
+
+        output_text = json.dumps(output)
+        return ModelResponse(
+            output=[ResponseOutputMessage(
+                id="stub",
+                type="message",
+                role="assistant",
+                status="completed",
+                content=[ResponseOutputText(type="output_text", text=output_text, annotations=[])],
+            )],
+            usage=Usage(requests=1, input_tokens=len(text) // 4, output_tokens=len(output_text) // 4),
+            response_id=None,
+        )
+
+    def stream_response(self, *args, **kwargs):
+        raise NotImplementedError("The stub model doesn't support streaming")
+
+
+def use_stub_model(latency: float):
+    """Point the guardrail agents of both scripts at the stub model."""
+    # There's nothing worth tracing without the OpenAI API
+    set_tracing_disabled(True)
+    model = StubGuardrailModel(latency)
+    input_guardrails.guardrail_agent = input_guardrails.guardrail_agent.clone(model=model)
+    output_guardrails.guardrail_agent = output_guardrails.guardrail_agent.clone(model=model)
+
+
+### 3. Bounded concurrency and rate limiting
+class RateLimiter:
+    """Spaces calls out so that at most `rate` of them start per second (no limit if `rate` is 0)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+### 4. The batch run
+async def evaluate_corpus(
+    records: list[dict],
+    concurrency: int = 8,
+    rate_limit: float = 0,
+    pack: int = 1,
+    use_pre_classifier: bool = True,
+):
+    """Run the input and output guardrails over `records`, returning per-item verdicts and stats."""
+    started_at = time.perf_counter()
+    # Ids are optional and can be anything, so every verdict also gets the record's position in the corpus
+    verdicts = [{"line": index + 1, "id": record.get("id")} for index, record in enumerate(records)]
+    call_latencies_ms = []
+    errors = 0
+
+    classifier = input_guardrails.pre_classifier
+    if not use_pre_classifier:
+        # A threshold that can never be reached, so every prompt is escalated to the LLM
+        classifier = input_guardrails.PreClassifier(non_math_threshold=-1.0)
+
+    # Prompts the local pre-classifier rejects never need an LLM call
+    pending_inputs = {}
+    for index, record in enumerate(records):
+        if record.get("prompt") is None:
+            continue
+        prompt_started_at = time.perf_counter()
+        is_math_related, probability = classifier.classify(record["prompt"])
+        if is_math_related is None:
+            pending_inputs[index] = record["prompt"]
+        else:
+            verdicts[index]["input"] = {
+                "tripped": not is_math_related,
+                "tier": "local",
+                "reasoning": f"Local pre-classifier (p_math={probability:.3f})",
+                "latency_ms": (time.perf_counter() - prompt_started_at) * 1000,
+            }
+    pending_outputs = {
+        index: record["response"] for index, record in enumerate(records) if record.get("response") is not None
+    }
+
+    # Each unit of work is one guardrail call, covering up to `pack` items
+    def chunks(pending: dict[int, str]):
+        indices = list(pending)
+        for start in range(0, len(indices), pack):
+            yield {index: pending[index] for index in indices[start:start + pack]}
+
+    units = [("input", chunk) for chunk in chunks(pending_inputs)]
+    units += [("output", chunk) for chunk in chunks(pending_outputs)]
+    queue: asyncio.Queue[tuple[str, dict[int, str]]] = asyncio.Queue()
+    for unit in units:
+        queue.put_nowait(unit)
+
+    rate_limiter = RateLimiter(rate_limit)
+    packed_input_agent = packed_agent(input_guardrails.guardrail_agent, "is_math_related")
+    packed_output_agent = packed_agent(output_guardrails.guardrail_agent, "is_math")
+    tutor_agent = Agent(name="Math Assistant")
+    context = RunContextWrapper(context=None)
+
+    async def check_single(kind: str, text: str) -> dict:
+        if kind == "input":
+            # The prompt was already escalated by the pre-classifier above. Like the packed calls, this
+            # doesn't write to GUARDRAIL_VERDICT_LOG: the verdicts go to --output instead
+            verdict = await input_guardrails.classify_with_llm(text)
+            return {"tripped": not verdict.is_math_related, "tier": "llm", "reasoning": verdict.reasoning}
+        result = await output_guardrails.math_guardrail.guardrail_function(
+            context, tutor_agent, output_guardrails.MessageOutput(response=text)
+        )
+        return {"tripped": result.tripwire_triggered, "tier": "llm", "reasoning": result.output_info.reasoning}
+
+    async def run_unit(kind: str, texts: dict[int, str]):
+        nonlocal errors
+        await rate_limiter.wait()
+        call_started_at = time.perf_counter()
+        try:
+            if len(texts) == 1:
+                [(index, text)] = texts.items()
+                results = {index: await check_single(kind, text)}
+            else:
+                agent = packed_input_agent if kind == "input" else packed_output_agent
+                packed = await check_packed(agent, texts)
+                results = {
+                    index: {"tripped": not verdict.verdict, "tier": "llm", "reasoning": verdict.reasoning}
+                    for index, verdict in packed.items()
+                }
+        except Exception as e:
+            errors += len(texts)
+            results = {index: {"error": str(e)} for index in texts}
+        latency_ms = (time.perf_counter() - call_started_at) * 1000
+        call_latencies_ms.append(latency_ms)
+
+        for index in texts:
+            verdicts[index][kind] = {**results.get(index, {"error": "No verdict returned for this item"}), "latency_ms": latency_ms}
+        missing = [index for index in texts if index not in results]
+        errors += len(missing)
+
+    async def worker():
+        while not queue.empty():
+            kind, texts = queue.get_nowait()
+            await run_unit(kind, texts)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+    wall_time = time.perf_counter() - started_at
+    stats = {
+        "items": len(records),
+        "input_checks": sum("input" in verdict for verdict in verdicts),
+        "output_checks": sum("output" in verdict for verdict in verdicts),
+        "decided_locally": sum(verdict.get("input", {}).get("tier") == "local" for verdict in verdicts),
+        "input_tripped": sum(verdict.get("input", {}).get("tripped", False) for verdict in verdicts),
+        "output_tripped": sum(verdict.get("output", {}).get("tripped", False) for verdict in verdicts),
+        "errors": errors,
+        "guardrail_calls": len(units),
+        "call_latency_ms": {
+            "p50": percentile(call_latencies_ms, 50),
+            "p95": percentile(call_latencies_ms, 95),
+            "p99": percentile(call_latencies_ms, 99),
+            "max": max(call_latencies_ms) if call_latencies_ms else None,
+        },
+        "wall_time_s": wall_time,
+        "throughput_items_per_s": len(records) / wall_time if wall_time else None,
+        "concurrency": concurrency,
+        "rate_limit_per_s": rate_limit,
+        "pack": pack,
+    }
+    return verdicts, stats
+
+
+def load_corpus(path: str) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+async def main(args):
+    if args.stub:
+        use_stub_model(args.stub_latency)
+
+    records = load_corpus(args.corpus)
+    verdicts, stats = await evaluate_corpus(
+        records,
+        concurrency=args.concurrency,
+        rate_limit=args.rate_limit,
+        pack=args.pack,
+        use_pre_classifier=not args.no_pre_classifier,
+    )
+
+    with open(args.output, "w") as f:
+        for verdict in verdicts:
+            f.write(json.dumps(verdict) + "\n")
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="JSONL file with one {\"id\", \"prompt\", \"response\"} object per line")
+    parser.add_argument("--output", default="verdicts.jsonl", help="Where to write the per-item verdicts")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum guardrail calls in flight")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Maximum guardrail calls started per second (0 for no limit)")
+    parser.add_argument("--pack", type=int, default=1, help="Items checked per guardrail call")
+    parser.add_argument("--no-pre-classifier", action="store_true", help="Send every prompt to the LLM guardrail")
+    parser.add_argument("--stub", action="store_true", help="Use a local stub model instead of the OpenAI API")
+    parser.add_argument("--stub-latency", type=float, default=0.05, help="Latency of each stub model call in seconds")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.pack < 1:
+        parser.error("--pack must be at least 1")
+    if args.rate_limit < 0:
+        parser.error("--rate-limit can't be negative")
+    asyncio.run(main(args))
@@ -0,0 +1,164 @@
+"""Benchmark the partial output guardrail mode against checking the complete output.
+
+  python benchmark-output-guardrails.py [--runs 3] [--words-per-second 50]
+
+A fake model streams MessageOutput JSON for a mix of math and non-math answers, and a fake guardrail
+marks text as math when it contains numbers, operators or math words. For each answer the benchmark
+compares:
+- "final": generate the complete output, then run the guardrail (what @output_guardrail does)
+- "partial": run the guardrail on the partial output while generating, so a passing verdict is
+  ready as soon as generation finishes
+
+and reports the wall time saved by the partial mode next to the guardrail calls and input tokens
+each mode spent, and whether both modes reached the same verdict (the fake guardrail is
+deterministic, so a real guardrail agent can disagree more often). No API calls are made.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import re
+import statistics
+import time
+
+from script_utils import load_script
+
+ANSWERS = [
+    ("Can you explain what a quadratic equation is?",
+     "A quadratic equation has the form ax^2 + bx + c = 0, and you can solve it with the quadratic "
+     "formula x = (-b ± sqrt(b^2 - 4ac)) / 2a."),
+    ("What is 12 times 7?",
+     "12 times 7 is 84, because 12 x 7 = 84."),
+    # A long preamble without any math, where a check on the partial output alone would fail
+    ("How do I solve a quadratic equation?",
+     "Great question! Let's think about this carefully, because it comes up a lot and there is a "
+     "neat general method that always works once you know it. Here it is: "
+     "x = (-b ± sqrt(b^2 - 4ac)) / 2a."),
+    ("What is the capital of France?",
+     "The capital of France is Paris, a city known for the Eiffel Tower, its museums and its cafes, "
+     "and it has been the centre of French culture and government for many centuries."),
+    ("Write a short poem about the sea",
+     "The waves roll in beneath the silver moon, the gulls cry softly as the tide goes out, and the "
+     "quiet shore waits patiently for morning light to return across the water."),
+    ("Who painted the Mona Lisa?",
+     "Leonardo da Vinci painted the Mona Lisa during the Italian Renaissance, and it now hangs in the "
+     "Louvre in Paris where millions of visitors come to see it every year."),
+    # A long off-topic answer, where partial mode makes the most guardrail checks
+    ("Tell me about the history of the Roman Empire",
+     "The Roman Empire grew out of the Roman Republic when Augustus became the first emperor. It "
+     "spread across Europe, North Africa and the Middle East, building roads, aqueducts and cities "
+     "that still stand today. Latin, the language of Rome, shaped many modern languages such as "
+     "Italian, French and Spanish. The western half of the empire fell after a long decline, while "
+     "the eastern half lived on as the Byzantine Empire with its capital in Constantinople."),
+]
+
+MATH_PATTERN = re.compile(r"\d|[=+^±]|\b(equation|formula|solve|sqrt|times|plus|minus)\b", re.IGNORECASE)
+
+
+class FakeStreamingModel:
+    """Generates a MessageOutput JSON answer one token per word at `words_per_second`."""
+
+    def __init__(self, answer: str, words_per_second: float):
+        raw = json.dumps({"response": answer})
+        self.tokens = [word + " " for word in raw.split(" ")]
+        self.tokens[-1] = self.tokens[-1].rstrip()
+        self.delay = 1 / words_per_second
+
+    async def stream(self):
+        for token in self.tokens:
+            await asyncio.sleep(self.delay)
+            yield token
+
+
+def make_fake_check(guardrails, latency: float, tokens: list[int]):
+    async def check(text: str):
+        tokens.append(estimate_tokens(text))
+        await asyncio.sleep(latency)
+        is_math = bool(MATH_PATTERN.search(text))
+        return guardrails.MathOutput(reasoning="fake guardrail", is_math=is_math)
+
+    return check
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text
+    return max(1, len(text) // 4)
+
+
+async def run_final(guardrails, args, answer: str):
+    model = FakeStreamingModel(answer, args.words_per_second)
+    started_at = time.perf_counter()
+    tokens: list[int] = []
+    raw = "".join([chunk async for chunk in model.stream()])
+    output = await make_fake_check(guardrails, args.guardrail_latency, tokens)(guardrails.partial_response(raw))
+    return {
+        "triggered": not output.is_math,
+        "checks": 1,
+        "guardrail_tokens": sum(tokens),
+        "wall_time_ms": (time.perf_counter() - started_at) * 1000,
+    }
+
+
+async def run_partial(guardrails, args, answer: str):
+    model = FakeStreamingModel(answer, args.words_per_second)
+    tokens: list[int] = []
+    started_at = time.perf_counter()
+    result = await guardrails.guard_partial_output(
+        model.stream(),
+        check=make_fake_check(guardrails, args.guardrail_latency, tokens),
+        check_interval=args.check_interval,
+    )
+    return {
+        "triggered": result["guardrail_triggered"],
+        "checks": result["guardrail_checks"],
+        "guardrail_tokens": sum(tokens),
+        "wall_time_ms": (time.perf_counter() - started_at) * 1000,
+    }
+
+
+async def main(args):
+    guardrails = load_script("output-guardrails.py")
+
+    report = []
+    for prompt, answer in ANSWERS:
+        final_runs = [await run_final(guardrails, args, answer) for _ in range(args.runs)]
+        partial_runs = [await run_partial(guardrails, args, answer) for _ in range(args.runs)]
+        final_wall = statistics.mean(run["wall_time_ms"] for run in final_runs)
+        partial_wall = statistics.mean(run["wall_time_ms"] for run in partial_runs)
+        report.append({
+            "prompt": prompt,
+            "triggered": partial_runs[0]["triggered"],
+            "verdicts_agree": all(p["triggered"] == f["triggered"] for p, f in zip(partial_runs, final_runs)),
+            "guardrail_checks": {
+                "final": statistics.mean(run["checks"] for run in final_runs),
+                "partial": statistics.mean(run["checks"] for run in partial_runs),
+            },
+            "guardrail_tokens": {
+                "final": statistics.mean(run["guardrail_tokens"] for run in final_runs),
+                "partial": statistics.mean(run["guardrail_tokens"] for run in partial_runs),
+            },
+            "wall_time_ms": {"final": final_wall, "partial": partial_wall},
+            "wall_time_saved_ms": final_wall - partial_wall,
+        })
+    print(json.dumps({
+        "answers": report,
+        "all_verdicts_agree": all(item["verdicts_agree"] for item in report),
+        "total_wall_time_saved_ms": sum(item["wall_time_saved_ms"] for item in report),
+        "total_guardrail_checks": {
+            mode: sum(item["guardrail_checks"][mode] for item in report) for mode in ("final", "partial")
+        },
+        "total_guardrail_tokens": {
+            mode: sum(item["guardrail_tokens"][mode] for item in report) for mode in ("final", "partial")
+        },
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Runs per answer and mode")
+    parser.add_argument("--words-per-second", type=float, default=50, help="Streaming rate of the fake model")
+    parser.add_argument("--guardrail-latency", type=float, default=0.3, help="Latency of the fake guardrail in seconds")
+    parser.add_argument("--check-interval", type=int, default=60)
+    asyncio.run(main(parser.parse_args()))
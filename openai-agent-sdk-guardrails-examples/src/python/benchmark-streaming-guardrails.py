@@ -0,0 +1,196 @@
+"""Benchmark the streaming guardrail checking modes against a fake streaming model.
+
+  python benchmark-streaming-guardrails.py [--length 3000] [--runs 5] [--check-interval 100]
+
+The fake model streams simple text at a fixed rate, with one word that's too complex for a ten year
+old inserted at a random position. The fake guardrail flags that word, and takes longer the more
+text it is sent, like a real model would. For every mode the benchmark reports how long after the
+complex word was streamed the guardrail tripped, and how many tokens were sent to the guardrail.
+
+Like a real model, the fake one keeps generating in the background until it is cancelled, so the
+benchmark also reports how many generated tokens and how much wall time were saved by cancelling it
+when the guardrail tripped. Pass --no-cancel to compare against not cancelling the upstream run.
+No API calls are made.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from script_utils import load_script
+
+COMPLEX_WORD = "photosynthesis"
+SIMPLE_WORDS = "the sun is big and warm so plants grow tall and green in the spring when it rains".split()
+
+# (mode, max_concurrent_checks) combinations to compare
+CONFIGURATIONS = [
+    ("full", 1),
+    ("incremental", 1),
+    ("incremental", 3),
+]
+
+
+class FakeStreamingModel:
+    """Generates one token per word at `words_per_second` in a background task, recording when the
+    complex word was streamed. Generation only stops early if `cancel` is called.
+    """
+
+    def __init__(self, length: int, complex_word_at: int, words_per_second: float):
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append(random.choice(SIMPLE_WORDS))
+        insert_at = 0
+        position = 0
+        while insert_at < len(words) and position < complex_word_at:
+            position += len(words[insert_at]) + 1
+            insert_at += 1
+        words.insert(insert_at, COMPLEX_WORD)
+        self.words = words
+        self.delay = 1 / words_per_second
+        self.complex_word_streamed_at = None
+        self.tokens_generated = 0
+        self.started_at = None
+        self.queue: asyncio.Queue[str | None] = asyncio.Queue()
+        self.producer: asyncio.Task | None = None
+
+    async def generate(self):
+        for word in self.words:
+            await asyncio.sleep(self.delay)
+            self.tokens_generated += 1
+            if word == COMPLEX_WORD:
+                self.complex_word_streamed_at = time.perf_counter()
+            self.queue.put_nowait(word + " ")
+        self.queue.put_nowait(None)
+
+    async def stream(self):
+        self.started_at = time.perf_counter()
+        self.producer = asyncio.create_task(self.generate())
+        while (chunk := await self.queue.get()) is not None:
+            yield chunk
+
+    def cancel(self):
+        self.producer.cancel()
+
+    async def wait_until_stopped(self) -> float:
+        """Wait for generation to finish or be cancelled, returning when it stopped."""
+        await asyncio.gather(self.producer, return_exceptions=True)
+        return time.perf_counter()
+
+    def wall_time_saved(self, stopped_at: float) -> float:
+        """Seconds saved compared to generating the whole response at the rate actually achieved."""
+        elapsed = stopped_at - self.started_at
+        return elapsed / max(self.tokens_generated, 1) * len(self.words) - elapsed
+
+
+def make_fake_check(guardrails, base_latency: float, latency_per_token: float, tokens: list[int]):
+    """A fake guardrail whose latency grows with its input, like a real model's prefill does."""
+
+    async def simulate(text: str) -> bool:
+        tokens.append(estimate_tokens(text))
+        await asyncio.sleep(base_latency + latency_per_token * estimate_tokens(text))
+        return COMPLEX_WORD not in text
+
+    async def check(text: str):
+        readable = await simulate(text)
+        return guardrails.GuardrailOutput(
+            reasoning="" if readable else f"'{COMPLEX_WORD}' is too complex",
+            is_readable_by_ten_year_old=readable,
+        )
+
+    async def check_incremental(text: str, summary: str):
+        readable = await simulate(summary + text)
+        return guardrails.IncrementalGuardrailOutput(
+            reasoning="" if readable else f"'{COMPLEX_WORD}' is too complex",
+            is_readable_by_ten_year_old=readable,
+            summary="A simple explanation of how plants grow.",
+        )
+
+    return check, check_incremental
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text
+    return max(1, len(text) // 4)
+
+
+async def run_once(guardrails, args, mode: str, max_concurrent_checks: int, complex_word_at: int, seed: int):
+    random.seed(seed)
+    model = FakeStreamingModel(args.length, complex_word_at, args.words_per_second)
+    tokens: list[int] = []
+    check, check_incremental = make_fake_check(guardrails, args.base_latency, args.latency_per_token, tokens)
+
+    result = await guardrails.guard_stream(
+        model.stream(),
+        check_interval=args.check_interval,
+        mode=mode,
+        overlap=args.overlap,
+        max_concurrent_checks=max_concurrent_checks,
+        character_limit=args.length * 2,
+        check=check if mode == "full" else check_incremental,
+        cancel=None if args.no_cancel else model.cancel,
+    )
+    tripped_at = time.perf_counter() if result["guardrail_triggered"] else None
+    generation_stopped_at = await model.wait_until_stopped()
+    detection_delay_ms = (
+        (tripped_at - model.complex_word_streamed_at) * 1000
+        if tripped_at and model.complex_word_streamed_at
+        else None
+    )
+    return {
+        "detected": result["guardrail_triggered"],
+        "detection_delay_ms": detection_delay_ms,
+        "time_to_verdict_ms": result["time_to_verdict_ms"],
+        "guardrail_tokens": sum(tokens),
+        "checks": result["guardrail_checks"],
+        "checks_cancelled": result["guardrail_checks_cancelled"],
+        "tokens_saved": len(model.words) - model.tokens_generated,
+        "wall_time_saved_ms": model.wall_time_saved(generation_stopped_at) * 1000,
+    }
+
+
+async def main(args):
+    guardrails = load_script("streaming-guardrails.py")
+    positions = [int(args.length * (0.2 + 0.7 * i / max(args.runs - 1, 1))) for i in range(args.runs)]
+
+    report = []
+    for mode, max_concurrent_checks in CONFIGURATIONS:
+        runs = [
+            await run_once(guardrails, args, mode, max_concurrent_checks, position, seed)
+            for seed, position in enumerate(positions)
+        ]
+        delays = [run["detection_delay_ms"] for run in runs if run["detection_delay_ms"] is not None]
+        verdict_times = [run["time_to_verdict_ms"] for run in runs if run["time_to_verdict_ms"] is not None]
+        report.append({
+            "mode": mode,
+            "max_concurrent_checks": max_concurrent_checks,
+            "detection_rate": sum(run["detected"] for run in runs) / len(runs),
+            "detection_delay_ms": {
+                "mean": statistics.mean(delays) if delays else None,
+                "max": max(delays) if delays else None,
+            },
+            "time_to_verdict_ms": statistics.mean(verdict_times) if verdict_times else None,
+            "guardrail_tokens_per_run": statistics.mean(run["guardrail_tokens"] for run in runs),
+            "checks_per_run": statistics.mean(run["checks"] for run in runs),
+            "checks_cancelled_per_run": statistics.mean(run["checks_cancelled"] for run in runs),
+            "generated_tokens_saved_per_run": statistics.mean(run["tokens_saved"] for run in runs),
+            "wall_time_saved_ms_per_run": statistics.mean(run["wall_time_saved_ms"] for run in runs),
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--length", type=int, default=3000, help="Characters in each fake response")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per mode, with the complex word at different positions")
+    parser.add_argument("--check-interval", type=int, default=100)
+    parser.add_argument("--overlap", type=int, default=100)
+    parser.add_argument("--words-per-second", type=float, default=200, help="Streaming rate of the fake model")
+    parser.add_argument("--base-latency", type=float, default=0.3, help="Fixed guardrail latency in seconds")
+    parser.add_argument("--latency-per-token", type=float, default=0.0002, help="Extra guardrail latency per input token in seconds")
+    parser.add_argument("--no-cancel", action="store_true", help="Don't cancel the fake model when the guardrail trips")
+    asyncio.run(main(parser.parse_args()))
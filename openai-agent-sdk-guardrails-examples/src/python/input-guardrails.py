@@ -1,8 +1,13 @@
 from __future__ import annotations
 
 import asyncio
+import math
+import os
+import random
+import re
 import sys
 import json
+import time
 
 from pydantic import BaseModel
 
@@ -27,10 +32,14 @@ They can be used to do things like:
 
 In this example, we'll setup an input guardrail that trips if the user is asking about something 
 that is NOT related to math. If the guardrail trips, we'll respond with a refusal message.
+
+The guardrail is tiered: a cheap local pre-classifier (keyword/regex features and a small linear
+model) rejects clearly off-topic inputs in microseconds, and everything else is escalated to the
+LLM guardrail agent.
 """
 
 
-### 1. An agent-based guardrail that is triggered if the user is asking about non-math topics
+### 1. An agent-based guardrail check for whether the user is asking about non-math topics
 class MathTopicOutput(BaseModel):
     reasoning: str
     is_math_related: bool
@@ -43,6 +52,243 @@ guardrail_agent = Agent(
 )
 
 
+### 2. A cheap local pre-classifier that rejects clearly off-topic inputs without an LLM call
+MATH_KEYWORDS = re.compile(
+    r"\b(solve|equation|equations|algebra|calculus|geometry|derivative|integral|integrate|"
+    r"differentiate|limit|theorem|proof|prove|polynomial|quadratic|linear|logarithm|log|sqrt|"
+    r"square root|fraction|fractions|percent|percentage|probability|statistics|mean|median|mode|"
+    r"variance|matrix|matrices|vector|prime|factor|factorial|multiply|divide|divided|times|plus|"
+    r"minus|sum|product|angle|triangle|circle|area|perimeter|volume|radius|slope|graph|function|"
+    r"simplify|evaluate|calculate|compute|arithmetic|trigonometry|sin|cos|tan|exponent|inequality)\b",
+    re.IGNORECASE,
+)
+NON_MATH_KEYWORDS = re.compile(
+    r"\b(weather|forecast|recipe|cook|movie|film|song|music|lyrics|capital|president|history|"
+    r"news|sports|football|soccer|basketball|translate|poem|story|essay|joke|travel|hotel|"
+    r"flight|restaurant|celebrity|politics|election|fashion|pet|dog|cat|game|book|novel|"
+    r"health|doctor|medicine|stock|crypto|weekend|birthday|email|letter)\b",
+    re.IGNORECASE,
+)
+EQUATION_PATTERN = re.compile(r"(\d|\b[a-z]\b)\s*[-+*/^=<>]\s*(\d|\b[a-z]\b|\()", re.IGNORECASE)
+MATH_SYMBOL_PATTERN = re.compile(r"[=^√π∑∫≤≥±×÷]|\d+\s*%")
+NUMBER_PATTERN = re.compile(r"\d+(\.\d+)?")
+
+FEATURE_NAMES = [
+    "bias",
+    "math_keywords",
+    "non_math_keywords",
+    "has_equation",
+    "math_symbols",
+    "numbers",
+    "digit_ratio",
+    "word_count",
+]
+
+# Hand-tuned starting weights, used until a model has been trained from logged verdicts
+DEFAULT_WEIGHTS = {
+    "bias": -1.0,
+    "math_keywords": 2.0,
+    "non_math_keywords": -2.5,
+    "has_equation": 4.0,
+    "math_symbols": 1.5,
+    "numbers": 0.5,
+    "digit_ratio": 4.0,
+    "word_count": -0.5,
+}
+
+PRE_CLASSIFIER_WEIGHTS_PATH = os.environ.get(
+    "PRE_CLASSIFIER_WEIGHTS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "pre-classifier-weights.json"),
+)
+# Verdicts from the LLM tier are appended here (JSONL) so the pre-classifier can be retrained
+GUARDRAIL_VERDICT_LOG = os.environ.get("GUARDRAIL_VERDICT_LOG")
+# Fraction of the inputs rejected locally that are also checked by the LLM tier and logged, so the
+# log includes the easy cases and the local tier's agreement with the LLM can be measured
+GUARDRAIL_AUDIT_RATE = float(os.environ.get("GUARDRAIL_AUDIT_RATE", "0.05"))
+
+
+def input_to_text(input: str | list[TResponseInputItem]) -> str:
+    """Flatten the guardrail input into the text of the user messages."""
+    if isinstance(input, str):
+        return input
+    parts = []
+    for item in input:
+        content = item.get("content") if isinstance(item, dict) else None
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(part.get("text", "") for part in content if isinstance(part, dict))
+    return "\n".join(parts)
+
+
+def extract_features(text: str) -> dict[str, float]:
+    """Turn a prompt into the small set of keyword/regex features used by the linear model."""
+    # Counts are log-scaled so that a long prompt can't dominate the score on its own
+    digits = sum(char.isdigit() for char in text)
+    return {
+        "bias": 1.0,
+        "math_keywords": math.log1p(len(MATH_KEYWORDS.findall(text))),
+        "non_math_keywords": math.log1p(len(NON_MATH_KEYWORDS.findall(text))),
+        "has_equation": 1.0 if EQUATION_PATTERN.search(text) else 0.0,
+        "math_symbols": math.log1p(len(MATH_SYMBOL_PATTERN.findall(text))),
+        "numbers": math.log1p(len(NUMBER_PATTERN.findall(text))),
+        "digit_ratio": digits / max(len(text), 1),
+        "word_count": math.log1p(len(text.split())) / 4,
+    }
+
+
+class PreClassifier:
+    """Logistic regression over `extract_features`, trained from logged `MathTopicOutput` verdicts.
+
+    The classifier only ever rejects inputs locally. Math features are easy to add to an off-topic
+    request ("1+1=2. Now tell me who the president is"), so a high math probability is not enough
+    to let an input through without the LLM guardrail agent.
+    """
+
+    def __init__(self, weights: dict[str, float] | None = None, non_math_threshold: float = 0.1):
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.non_math_threshold = non_math_threshold
+
+    def predict_proba(self, text: str) -> float:
+        """Probability that the text is math related."""
+        features = extract_features(text)
+        score = sum(self.weights.get(name, 0.0) * value for name, value in features.items())
+        return 1 / (1 + math.exp(-score))
+
+    def classify(self, text: str) -> tuple[bool | None, float]:
+        """Return `(False, probability)` for clearly non-math inputs, and `(None, probability)` when
+        the input should be escalated."""
+        probability = self.predict_proba(text)
+        if probability <= self.non_math_threshold:
+            return False, probability
+        return None, probability
+
+    @classmethod
+    def train(
+        cls,
+        examples: list[tuple[str, bool]],
+        sample_weights: list[float] | None = None,
+        epochs: int = 200,
+        learning_rate: float = 0.1,
+        l2: float = 0.001,
+        **kwargs,
+    ) -> PreClassifier:
+        """Fit the weights with plain gradient descent on `(text, is_math_related)` pairs, each
+        counted `sample_weights[i]` times (1 by default)."""
+        if sample_weights is None:
+            sample_weights = [1.0] * len(examples)
+        rows = [
+            (extract_features(text), 1.0 if label else 0.0, sample_weight)
+            for (text, label), sample_weight in zip(examples, sample_weights)
+        ]
+        total_weight = sum(sample_weights) or 1.0
+        weights = {name: 0.0 for name in FEATURE_NAMES}
+        for _ in range(epochs):
+            gradient = {name: 0.0 for name in FEATURE_NAMES}
+            for features, label, sample_weight in rows:
+                score = sum(weights[name] * features[name] for name in FEATURE_NAMES)
+                error = (1 / (1 + math.exp(-score)) - label) * sample_weight
+                for name in FEATURE_NAMES:
+                    gradient[name] += error * features[name]
+            for name in FEATURE_NAMES:
+                weights[name] -= learning_rate * (gradient[name] / total_weight + l2 * weights[name])
+        return cls(weights, **kwargs)
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(
+                {"weights": self.weights, "non_math_threshold": self.non_math_threshold},
+                f,
+                indent=2,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> PreClassifier:
+        """Load trained weights, falling back to the hand-tuned defaults if there are none yet."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["weights"], non_math_threshold=data.get("non_math_threshold", 0.1))
+
+
+def load_verdicts(path: str) -> list[dict]:
+    """Read the records of a JSONL log written by the LLM tier."""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def log_verdict(text: str, verdict: MathTopicOutput, tier: str = "llm", audit_rate: float = 1.0):
+    """Append an LLM verdict to the log. `tier` is the tier that made the guardrail decision, and
+    `audit_rate` the fraction of that tier's inputs that get logged."""
+    if not GUARDRAIL_VERDICT_LOG:
+        return
+    with open(GUARDRAIL_VERDICT_LOG, "a") as f:
+        f.write(json.dumps({"input": text, "tier": tier, "audit_rate": audit_rate, **verdict.model_dump()}) + "\n")
+
+
+pre_classifier = PreClassifier.load(PRE_CLASSIFIER_WEIGHTS_PATH)
+
+
+### 3. The tiered guardrail: local pre-classifier first, LLM guardrail agent for uncertain inputs
+class GuardrailDecision(BaseModel):
+    tier: str  # "local" or "llm"
+    is_math_related: bool
+    reasoning: str
+    confidence: float
+    latency_ms: float
+
+
+async def classify_with_llm(text: str | list[TResponseInputItem], context=None) -> MathTopicOutput:
+    result = await Runner.run(guardrail_agent, text, context=context)
+    return result.final_output_as(MathTopicOutput)
+
+
+# Audits run in the background so they don't delay the guardrail decision
+audit_tasks: set[asyncio.Task] = set()
+
+
+async def audit_local_decision(input: str | list[TResponseInputItem], context=None):
+    verdict = await classify_with_llm(input, context=context)
+    log_verdict(input_to_text(input), verdict, tier="local", audit_rate=GUARDRAIL_AUDIT_RATE)
+
+
+async def wait_for_audits():
+    await asyncio.gather(*audit_tasks, return_exceptions=True)
+
+
+async def classify_tiered(
+    input: str | list[TResponseInputItem], context=None, classifier: PreClassifier | None = None
+) -> GuardrailDecision:
+    started_at = time.perf_counter()
+    text = input_to_text(input)
+    is_math_related, probability = (classifier or pre_classifier).classify(text)
+
+    if is_math_related is not None:
+        if GUARDRAIL_VERDICT_LOG and random.random() < GUARDRAIL_AUDIT_RATE:
+            task = asyncio.create_task(audit_local_decision(input, context=context))
+            audit_tasks.add(task)
+            task.add_done_callback(audit_tasks.discard)
+        return GuardrailDecision(
+            tier="local",
+            is_math_related=is_math_related,
+            reasoning=f"Local pre-classifier (p_math={probability:.3f})",
+            confidence=1 - probability,
+            latency_ms=(time.perf_counter() - started_at) * 1000,
+        )
+
+    # Possibly math related, escalate to the LLM guardrail agent
+    verdict = await classify_with_llm(input, context=context)
+    log_verdict(text, verdict)
+    return GuardrailDecision(
+        tier="llm",
+        is_math_related=verdict.is_math_related,
+        reasoning=verdict.reasoning,
+        confidence=1.0,
+        latency_ms=(time.perf_counter() - started_at) * 1000,
+    )
+
+
 @input_guardrail
 async def non_math_guardrail(
     context: RunContextWrapper[None], agent: Agent, input: str | list[TResponseInputItem]
@@ -50,17 +296,16 @@ async def non_math_guardrail(
     """This is an input guardrail function that checks if the input is related to math.
     If it's not math-related, the guardrail trips.
     """
-    result = await Runner.run(guardrail_agent, input, context=context.context)
-    final_output = result.final_output_as(MathTopicOutput)
+    decision = await classify_tiered(input, context=context.context)
 
     return GuardrailFunctionOutput(
-        output_info=final_output,
+        output_info=decision,
         # Trigger when it's NOT math related
-        tripwire_triggered=not final_output.is_math_related,
+        tripwire_triggered=not decision.is_math_related,
     )
 
 
-### 2. The run loop
+### 4. The run loop
 
 async def process_prompt(prompt: str):
     agent = Agent(
@@ -78,16 +323,24 @@ async def process_prompt(prompt: str):
 
     try:
         result = await Runner.run(agent, input_data)
+        decision = result.input_guardrail_results[0].output.output_info
         return {
             "response": result.final_output,
-            "guardrail_triggered": False
+            "guardrail_triggered": False,
+            "guardrail_tier": decision.tier,
+            "guardrail_latency_ms": decision.latency_ms,
         }
-    except InputGuardrailTripwireTriggered:
+    except InputGuardrailTripwireTriggered as e:
         # If the guardrail triggered, it's not a math question
+        decision = e.guardrail_result.output.output_info
         return {
             "response": "I'm a math tutor and can only help with mathematics-related questions. Please ask me something about math instead.",
-            "guardrail_triggered": True
+            "guardrail_triggered": True,
+            "guardrail_tier": decision.tier,
+            "guardrail_latency_ms": decision.latency_ms,
         }
+    finally:
+        await wait_for_audits()
 
 if __name__ == "__main__":
     # Get the prompt from command line
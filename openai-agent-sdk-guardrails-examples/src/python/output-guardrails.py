@@ -8,9 +8,18 @@ from agents import (
     TResponseInputItem,
     output_guardrail,
 )
+from openai.types.responses import ResponseTextDeltaEvent
+from typing import AsyncIterator, Callable
 import asyncio
 import sys
 import json
+import time
+
+"""
+Output guardrails normally run once the agent has generated its complete output. This example also
+has a "partial" mode (pass it as the second argument) that runs the math guardrail on the partial
+response while the agent is still generating, so a passing verdict is ready as soon as it finishes.
+"""
 
 class MessageOutput(BaseModel): 
     response: str
@@ -43,8 +52,156 @@ agent = Agent(
     output_type=MessageOutput,
 )
 
+# In partial mode the guardrail runs on the stream instead, so the agent doesn't need its own
+streaming_agent = agent.clone(output_guardrails=[])
+
+
+async def check_math(text: str) -> MathOutput:
+    result = await Runner.run(guardrail_agent, text)
+    return result.final_output_as(MathOutput)
+
+
+async def stream_text(result) -> AsyncIterator[str]:
+    """Yield the text deltas of a streamed run."""
+    async for event in result.stream_events():
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            yield event.data.delta
+
+
+JSON_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+
+def partial_response(raw: str) -> str:
+    """Extract the `response` field from the partially streamed MessageOutput JSON."""
+    key = raw.find('"response"')
+    colon = raw.find(":", key) if key != -1 else -1
+    start = raw.find('"', colon + 1) if colon != -1 else -1
+    if start == -1:
+        return ""
+
+    chars = []
+    i = start + 1
+    while i < len(raw):
+        char = raw[i]
+        if char == '"':
+            break
+        if char == "\\":
+            if i + 1 >= len(raw):
+                break  # The rest of the escape sequence hasn't been streamed yet
+            escaped = raw[i + 1]
+            if escaped == "u":
+                if i + 6 > len(raw):
+                    break
+                code = int(raw[i + 2:i + 6], 16)
+                if 0xD800 <= code < 0xDC00:
+                    # A character outside the BMP is escaped as a surrogate pair, which has to be combined
+                    if i + 12 > len(raw):
+                        break  # The low surrogate hasn't been streamed yet
+                    if raw[i + 6:i + 8] == "\\u" and 0xDC00 <= (low := int(raw[i + 8:i + 12], 16)) < 0xE000:
+                        chars.append(chr(0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)))
+                        i += 12
+                        continue
+                chars.append(chr(code))
+                i += 6
+                continue
+            chars.append(JSON_ESCAPES.get(escaped, escaped))
+            i += 2
+            continue
+        chars.append(char)
+        i += 1
+    return "".join(chars)
+
+
+async def guard_partial_output(
+    deltas: AsyncIterator[str],
+    check: Callable = check_math,
+    check_interval: int = 60,
+):
+    """Run the math guardrail on the partial response while the agent is still generating.
+
+    Math content can't disappear once it's been written, so the first passing check settles the
+    guardrail and no check is needed after generation. A failing check settles nothing, because the
+    rest of the response can still add the math, so the response is checked again as it grows and the
+    complete response is checked as usual if no partial check passed.
+
+    The verdict usually matches checking the complete output, but a prefix that passes doesn't
+    guarantee the complete response would: the guardrail agent treats general topics with incidental
+    numbers as non-math, and it isn't deterministic. On responses without math this mode makes more
+    guardrail calls than checking the complete output once.
+    """
+    started_at = time.perf_counter()
+    raw = ""
+    checked_upto = 0
+    checks = 0
+    pending = None  # (task, length of the response it checks)
+    partial = None  # A partial check still running when generation finished
+    verdict = None  # (MathOutput, length of the response it was decided on)
+
+    def start_check(response: str):
+        nonlocal checked_upto, checks, pending
+        pending = (asyncio.create_task(check(response)), len(response))
+        checked_upto = len(response)
+        checks += 1
+
+    def handle_pending(final: bool) -> None:
+        nonlocal pending, verdict
+        task, checked_length = pending
+        pending = None
+        output = task.result()
+        if output.is_math or final:
+            verdict = (output, checked_length)
+
+    try:
+        async for delta in deltas:
+            raw += delta
+            response = partial_response(raw)
+
+            if pending and pending[0].done():
+                handle_pending(final=False)
+
+            if not verdict and not pending and len(response) - checked_upto >= check_interval:
+                start_check(response)
+
+        response = partial_response(raw)
+        generation_finished_at = time.perf_counter()
+
+        # A check that finished after the last delta may already settle the guardrail
+        if not verdict and pending and pending[0].done():
+            handle_pending(final=pending[1] == len(response))
+
+        if not verdict:
+            # Generation finished before a partial check passed, so check the complete response. A
+            # partial check that's still running carries on alongside it, in case it passes first
+            partial = pending
+            if not partial or partial[1] < len(response):
+                start_check(response)
+            final_task = pending[0]
+            waiting = {final_task} | ({partial[0]} if partial else set())
+            while not verdict:
+                done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+                if final_task in done:
+                    verdict = (final_task.result(), len(response))
+                elif partial[0].result().is_math:
+                    verdict = (partial[0].result(), partial[1])
+    finally:
+        for outstanding in (pending, partial):
+            if outstanding:
+                outstanding[0].cancel()
+
+    output, decided_at = verdict
+    return {
+        "response": response,
+        "guardrail_triggered": not output.is_math,
+        "math_analysis": output.reasoning,
+        "guardrail_decided_at": decided_at,
+        "guardrail_checks": checks,
+        "generation_ms": (generation_finished_at - started_at) * 1000,
+        "wall_time_ms": (time.perf_counter() - started_at) * 1000,
+    }
+
 async def main():
-    # Get prompt from command line or use default
+    # Get prompt and guardrail mode ("final" or "partial") from command line or use defaults
+    mode = sys.argv[2] if len(sys.argv) > 2 else "final"
     default_prompt = "Can you explain what a quadratic equation is?"
     if len(sys.argv) > 1:
         prompt = str(sys.argv[1])
@@ -62,6 +219,26 @@ async def main():
         }
     ]
     
+    started_at = time.perf_counter()
+
+    if mode == "partial":
+        result = Runner.run_streamed(streaming_agent, input_data)
+        guardrail_info = await guard_partial_output(stream_text(result))
+        triggered = guardrail_info["guardrail_triggered"]
+        # Output JSON for TypeScript to parse
+        output = {
+            "response": "Guardrail triggered - response didn't contain sufficient math content" if triggered else guardrail_info["response"],
+            "guardrail_triggered": triggered,
+            "received_prompt": prompt,
+            "guardrail_mode": mode,
+            "guardrail_decided_at": guardrail_info["guardrail_decided_at"],
+            "wall_time_ms": guardrail_info["wall_time_ms"],
+        }
+        if triggered:
+            output["math_analysis"] = guardrail_info["response"]
+        print(json.dumps(output))
+        return
+
     # Try to run the agent with the prompt
     try:
         result = await Runner.run(agent, input_data)
@@ -69,7 +246,9 @@ async def main():
         output = {
             "response": result.final_output.response,
             "guardrail_triggered": False,
-            "received_prompt": prompt
+            "received_prompt": prompt,
+            "guardrail_mode": mode,
+            "wall_time_ms": (time.perf_counter() - started_at) * 1000,
         }
         print(json.dumps(output))
 
@@ -79,7 +258,9 @@ async def main():
             "response": "Guardrail triggered - response didn't contain sufficient math content",
             "guardrail_triggered": True,
             "math_analysis": e.guardrail_result.agent_output.response,
-            "received_prompt": prompt
+            "received_prompt": prompt,
+            "guardrail_mode": mode,
+            "wall_time_ms": (time.perf_counter() - started_at) * 1000,
         }
         print(json.dumps(output))
 
@@ -0,0 +1,161 @@
+"""Train and benchmark the local pre-classifier tier used by input-guardrails.py.
+
+  python pre-classifier.py train verdicts.jsonl
+  python pre-classifier.py benchmark [verdicts.jsonl] [--live]
+
+The verdicts file is the JSONL log the LLM tier writes when GUARDRAIL_VERDICT_LOG is set, one
+`{"input": ..., "tier": ..., "is_math_related": ...}` object per line. It holds every escalated
+input and a GUARDRAIL_AUDIT_RATE sample of the inputs the local tier rejected, which the LLM tier
+checked as well.
+
+Training weights each audited record by 1 / its audit rate, so the easy cases the local tier rejects
+count as often as they occur rather than as often as they are sampled.
+
+The benchmark measures how fast the local tier is, how many inputs it decides on its own and how
+often it agrees with the LLM tier. Audited records are weighted by their sampling rate when
+estimating the local decision rate, and the agreement rate is measured on the logged inputs the
+classifier decides locally (with unchanged weights, exactly the audited ones). By default the logged
+verdicts are used as the LLM reference; pass --live to query the guardrail agent instead (this needs
+OPENAI_API_KEY and also measures the LLM tier's latency).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from script_utils import load_script, percentile
+
+
+# Used when no verdicts file is given, so the benchmark can be run straight away
+SAMPLE_VERDICTS = [
+    ("solve 2x+3=7", True),
+    ("What is the derivative of x^2 + 3x?", True),
+    ("Can you explain what a quadratic equation is?", True),
+    ("What is 15% of 80?", True),
+    ("How do I calculate the area of a circle with radius 4?", True),
+    ("Prove that the square root of 2 is irrational", True),
+    ("What's the probability of rolling two sixes with two dice?", True),
+    ("Simplify the fraction 42/56", True),
+    ("How many ways can 5 people sit in a row?", True),
+    ("Why does dividing by zero not work?", True),
+    ("what's the weather", False),
+    ("What is the capital of France?", False),
+    ("Write a poem about the ocean", False),
+    ("Recommend a good movie for the weekend", False),
+    ("Who won the football game last night?", False),
+    ("Translate 'good morning' into Spanish", False),
+    ("Give me a recipe for banana bread", False),
+    ("How do I train my dog to sit?", False),
+    ("What happened in the news today?", False),
+    ("Tell me a story about a dragon", False),
+]
+
+
+def train(guardrails, args):
+    records = guardrails.load_verdicts(args.verdicts)
+    examples = [(record["input"], bool(record["is_math_related"])) for record in records]
+    # Each audited record stands for 1 / audit_rate inputs the local tier decided
+    sample_weights = [1 / record.get("audit_rate", 1.0) for record in records]
+    classifier = guardrails.PreClassifier.train(
+        examples, sample_weights, epochs=args.epochs, non_math_threshold=args.non_math_threshold
+    )
+    classifier.save(args.output)
+
+    correct = sum(
+        sample_weight * ((classifier.predict_proba(text) >= 0.5) == label)
+        for (text, label), sample_weight in zip(examples, sample_weights)
+    )
+    print(json.dumps({
+        "examples": len(examples),
+        "training_accuracy": correct / sum(sample_weights) if examples else None,
+        "weights_path": args.output,
+        "weights": classifier.weights,
+    }, indent=2))
+
+
+async def benchmark(guardrails, args):
+    if args.verdicts:
+        records = guardrails.load_verdicts(args.verdicts)
+    else:
+        records = [{"input": text, "is_math_related": label} for text, label in SAMPLE_VERDICTS]
+    classifier = guardrails.PreClassifier.load(args.weights)
+
+    local_latencies_us = []
+    llm_latencies_ms = []
+    decided = 0
+    agreed = 0
+    # Each audited record stands for 1 / audit_rate inputs the local tier decided
+    total_weight = 0.0
+    decided_weight = 0.0
+    for record in records:
+        text = record["input"]
+        weight = 1 / record.get("audit_rate", 1.0)
+        started_at = time.perf_counter()
+        for _ in range(args.repeat):
+            is_math_related, _ = classifier.classify(text)
+        local_latencies_us.append((time.perf_counter() - started_at) / args.repeat * 1_000_000)
+
+        reference = bool(record["is_math_related"])
+        if args.live:
+            started_at = time.perf_counter()
+            verdict = await guardrails.classify_with_llm(text)
+            llm_latencies_ms.append((time.perf_counter() - started_at) * 1000)
+            reference = verdict.is_math_related
+
+        total_weight += weight
+        if is_math_related is not None:
+            decided += 1
+            decided_weight += weight
+            agreed += is_math_related == reference
+
+    report = {
+        "items": len(records),
+        "audited_local_decisions": sum(record.get("tier") == "local" for record in records),
+        "decided_locally": decided,
+        "escalated_to_llm": len(records) - decided,
+        "local_decision_rate": decided_weight / total_weight if total_weight else 0.0,
+        "agreement_rate_with_llm": agreed / decided if decided else None,
+        "local_latency_us": {
+            "p50": percentile(local_latencies_us, 50),
+            "p95": percentile(local_latencies_us, 95),
+            "max": max(local_latencies_us) if local_latencies_us else None,
+        },
+        "reference": "live" if args.live else "logged",
+    }
+    if llm_latencies_ms:
+        report["llm_latency_ms"] = {
+            "p50": percentile(llm_latencies_ms, 50),
+            "p95": percentile(llm_latencies_ms, 95),
+            "mean": statistics.mean(llm_latencies_ms),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    # The default weights path ($PRE_CLASSIFIER_WEIGHTS or next to the script) is the one the guardrail loads
+    guardrails = load_script("input-guardrails.py")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = subparsers.add_parser("train", help="Train the pre-classifier from logged verdicts")
+    train_parser.add_argument("verdicts", help="JSONL file of logged MathTopicOutput verdicts")
+    train_parser.add_argument("--output", default=guardrails.PRE_CLASSIFIER_WEIGHTS_PATH)
+    train_parser.add_argument("--epochs", type=int, default=200)
+    train_parser.add_argument("--non-math-threshold", type=float, default=0.1)
+
+    benchmark_parser = subparsers.add_parser("benchmark", help="Measure latency and agreement with the LLM tier")
+    benchmark_parser.add_argument("verdicts", nargs="?", help="JSONL file of logged verdicts (defaults to a built-in sample)")
+    benchmark_parser.add_argument("--weights", default=guardrails.PRE_CLASSIFIER_WEIGHTS_PATH)
+    benchmark_parser.add_argument("--repeat", type=int, default=1000, help="Local classifications per item, for stable timings")
+    benchmark_parser.add_argument("--live", action="store_true", help="Query the LLM guardrail agent as the reference")
+
+    args = parser.parse_args()
+    if args.command == "train":
+        train(guardrails, args)
+    else:
+        asyncio.run(benchmark(guardrails, args))
@@ -0,0 +1,30 @@
+"""Helpers shared by the scripts in this directory."""
+
+from __future__ import annotations
+
+import importlib.util
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(path: str):
+    """Import a script by its file name in this directory, or by its full path.
+
+    The script names have dashes in them, so they can't be imported with a regular import statement.
+    The module is registered in sys.modules before it runs, which dataclasses defined in it need.
+    """
+    path = os.path.join(SCRIPT_DIR, path)
+    spec = importlib.util.spec_from_file_location(os.path.basename(path)[:-3].replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
 import sys
 import json
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable
 
 from openai.types.responses import ResponseTextDeltaEvent
 from pydantic import BaseModel, Field
@@ -16,6 +20,12 @@ termination if bad output is detected.
 
 The expected output is that you'll see a bunch of tokens stream in, then the guardrail will trigger
 and stop the streaming.
+
+There are two checking modes:
+- "full": every check sends the whole response so far to the guardrail. Simple, but the guardrail
+  input grows quadratically with the response length.
+- "incremental": every check only sends the new text plus a bounded overlap window, together with a
+  short summary of the response so far that the previous check returned.
 """
 
 
@@ -37,6 +47,12 @@ class GuardrailOutput(BaseModel):
     )
 
 
+class IncrementalGuardrailOutput(GuardrailOutput):
+    summary: str = Field(
+        description="One or two sentence summary of the whole response so far, including the new text."
+    )
+
+
 guardrail_agent = Agent(
     name="Checker",
     instructions=(
@@ -47,94 +63,267 @@ guardrail_agent = Agent(
     model="gpt-4o-mini",
 )
 
+incremental_guardrail_agent = Agent(
+    name="Incremental checker",
+    instructions=(
+        "You are checking a response while it is being written. You are given a summary of the "
+        "response so far and the newest text. Check if the newest text uses words or concepts too "
+        "complex for a ten year old. If it does, identify the specific problematic word or phrase. "
+        "Be brief and specific. Also return an updated one or two sentence summary of the whole "
+        "response so far."
+    ),
+    output_type=IncrementalGuardrailOutput,
+    model="gpt-4o-mini",
+)
+
+# The summary carried between incremental checks is kept short so the guardrail input stays bounded
+SUMMARY_MAX_CHARS = 300
+
+
+def combine_summaries(earlier: str, later: str) -> str:
+    """Join two summaries, keeping the end of the combination if it gets too long."""
+    combined = f"{earlier} {later}".strip()
+    if len(combined) <= SUMMARY_MAX_CHARS:
+        return combined
+    return combined[-SUMMARY_MAX_CHARS:].split(" ", 1)[-1]
+
 
 async def check_guardrail(text: str) -> GuardrailOutput:
     result = await Runner.run(guardrail_agent, text)
     return result.final_output_as(GuardrailOutput)
 
 
-async def process_prompt(question: str, check_interval: int = 30):
-    result = Runner.run_streamed(agent, question)
-    current_text = ""
-    guardrail_triggered = False
-    guardrail_reason = ""
-    guardrail_triggered_at = None
-    character_limit = 600
+async def check_guardrail_incremental(text: str, summary: str) -> IncrementalGuardrailOutput:
+    prompt = f"Summary of the response so far: {summary or '(start of response)'}\n\nNewest text:\n{text}"
+    result = await Runner.run(incremental_guardrail_agent, prompt)
+    return result.final_output_as(IncrementalGuardrailOutput)
 
-    # We will check the guardrail every N characters
-    next_guardrail_check_len = check_interval
-    guardrail_task = None
-    guardrail_check_started_at = None
 
+async def stream_text(result) -> AsyncIterator[str]:
+    """Yield the text deltas of a streamed run."""
     async for event in result.stream_events():
-        # Check if the guardrail has been triggered BEFORE processing new chunks
-        if guardrail_task and guardrail_task.done():
-            guardrail_result = guardrail_task.result()
-            if not guardrail_result.is_readable_by_ten_year_old:
-                guardrail_triggered = True
-                guardrail_reason = guardrail_result.reasoning
-                guardrail_triggered_at = guardrail_check_started_at  # Use when check started, not when it completed
-                break
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+            yield event.data.delta
+
+
+@dataclass
+class GuardrailCheck:
+    task: asyncio.Task
+    start: int  # Start of the checked window in the response text
+    unchecked_from: int  # Start of the text in the window that no earlier check covered
+    end: int  # Length of the response text when the check started
+    started_at: float
+    summary_upto: int = 0  # End of the text covered by the summary sent with the check
+
+
+async def guard_stream(
+    deltas: AsyncIterator[str],
+    check_interval: int = 30,
+    mode: str = "full",
+    overlap: int = 100,
+    max_concurrent_checks: int = 1,
+    character_limit: int = 600,
+    check: Callable | None = None,
+    on_delta: Callable[[str], None] | None = None,
+    cancel: Callable[[], None] | None = None,
+):
+    """Consume a stream of text deltas, running guardrail checks every `check_interval` characters.
+
+    Up to `max_concurrent_checks` checks can be in flight. If that many are already running when a
+    check is due, the text keeps accumulating and is covered by the next check instead. When a check
+    passes, any in-flight check whose window it fully covers is stale and gets cancelled.
+
+    When the guardrail trips or the character limit is reached, `cancel` is called to stop the
+    upstream generation and all outstanding checks are cancelled.
+    """
+    if mode not in ("full", "incremental"):
+        raise ValueError(f"Unknown guardrail mode: {mode}")
+    if check is None:
+        check = check_guardrail if mode == "full" else check_guardrail_incremental
+
+    stream_started_at = time.perf_counter()
+    current_text = ""
+    # End offset of every delta in the response text, and when it arrived
+    delta_ends: list[int] = []
+    delta_arrived_at: list[float] = []
+    checked_upto = 0  # End of the text covered by dispatched checks
+    summary = ""
+    summary_upto = 0
+    # Summaries returned by checks that finished before the stored summary reached their window
+    pending_summaries: list[tuple[GuardrailCheck, str]] = []
+    in_flight: list[GuardrailCheck] = []
+    check_latencies_ms = []
+    guardrail_input_chars = 0
+    checks_started = 0
+    checks_cancelled = 0
+    trip = None
+    stopped_early = False
+
+    def start_check():
+        nonlocal checked_upto, guardrail_input_chars, checks_started
+        end = len(current_text)
+        start = 0 if mode == "full" else max(0, checked_upto - overlap)
+        window = current_text[start:end]
+        coroutine = check(window) if mode == "full" else check(window, summary)
+        in_flight.append(
+            GuardrailCheck(asyncio.create_task(coroutine), start, checked_upto, end, time.perf_counter(), summary_upto)
+        )
+        checked_upto = end
+        guardrail_input_chars += len(window) + len(summary)
+        checks_started += 1
+
+    def arrived_at(offset: int) -> float:
+        """When the character at `offset` of the response text arrived on the stream."""
+        index = bisect.bisect_right(delta_ends, offset)
+        return delta_arrived_at[min(index, len(delta_arrived_at) - 1)] if delta_arrived_at else stream_started_at
+
+    def update_summary(finished: GuardrailCheck, new_summary: str):
+        """Fold a passing check's summary into the stored one.
+
+        The returned summary covers the check's input summary and its window. With concurrent checks,
+        the input summary can end before the window starts, so a summary is only used once the stored
+        summary covers the gap, and is combined with it rather than replacing it in that case.
+        """
+        nonlocal summary, summary_upto
+        pending_summaries.append((finished, new_summary[:SUMMARY_MAX_CHARS]))
+        pending_summaries.sort(key=lambda pending: pending[0].start)
+        while pending_summaries and pending_summaries[0][0].start <= summary_upto:
+            check, new_summary = pending_summaries.pop(0)
+            if check.end <= summary_upto:
+                continue
+            if check.summary_upto >= check.start:
+                summary = new_summary
             else:
-                guardrail_task = None
-                guardrail_check_started_at = None
+                summary = combine_summaries(summary, new_summary)
+            summary_upto = check.end
 
-        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
-            # Stream the chunk to stdout immediately
-            print(event.data.delta, end="", flush=True)
-            current_text += event.data.delta
+    def collect_finished_checks() -> bool:
+        """Handle finished checks in the order they were started. Returns True if the guardrail tripped."""
+        nonlocal checks_cancelled, trip
+        for finished in [c for c in in_flight if c.task.done()]:
+            if finished not in in_flight:
+                continue  # Already cancelled as stale by an earlier check in this loop
+            in_flight.remove(finished)
+            if finished.task.cancelled():
+                continue
+            output = finished.task.result()
+            finished_at = time.perf_counter()
+            check_latencies_ms.append((finished_at - finished.started_at) * 1000)
+
+            if not output.is_readable_by_ten_year_old:
+                trip = (finished, output, finished_at)
+                return True
+
+            if mode == "incremental":
+                update_summary(finished, output.summary)
+
+            for stale in [c for c in in_flight if c.start >= finished.start and c.end <= finished.end]:
+                stale.task.cancel()
+                in_flight.remove(stale)
+                checks_cancelled += 1
+        return False
+
+    try:
+        async for delta in deltas:
+            # Check if the guardrail has been triggered BEFORE processing new chunks
+            if collect_finished_checks():
+                stopped_early = True
+                break
+
+            if on_delta:
+                on_delta(delta)
+            current_text += delta
+            delta_ends.append(len(current_text))
+            delta_arrived_at.append(time.perf_counter())
 
             # Check if it's time to run the guardrail check
-            if len(current_text) >= next_guardrail_check_len and not guardrail_task:
-                guardrail_check_started_at = len(current_text)  # Record when this check started
-                guardrail_task = asyncio.create_task(check_guardrail(current_text))
-                next_guardrail_check_len += check_interval
+            if len(current_text) - checked_upto >= check_interval and len(in_flight) < max_concurrent_checks:
+                start_check()
 
             # Check guardrail status again AFTER processing this chunk
-            if guardrail_task and guardrail_task.done():
-                guardrail_result = guardrail_task.result()
-                if not guardrail_result.is_readable_by_ten_year_old:
-                    guardrail_triggered = True
-                    guardrail_reason = guardrail_result.reasoning
-                    guardrail_triggered_at = guardrail_check_started_at  # Use when check started, not when it completed
-                    break
-                else:
-                    guardrail_task = None
-                    guardrail_check_started_at = None
-
-        # Check character limit after processing the chunk
-        if len(current_text) >= character_limit:
-            break
-
-    # Do one final check on the final output if guardrail hasn't been triggered yet
-    if not guardrail_triggered:
-        final_check_started_at = len(current_text)
-        guardrail_result = await check_guardrail(current_text)
-        if not guardrail_result.is_readable_by_ten_year_old:
-            guardrail_triggered = True
-            guardrail_reason = guardrail_result.reasoning
-            guardrail_triggered_at = final_check_started_at
+            if collect_finished_checks():
+                stopped_early = True
+                break
+
+            # Check character limit after processing the chunk
+            if len(current_text) >= character_limit:
+                stopped_early = True
+                break
+
+        if stopped_early:
+            # Stop the model from generating any more tokens, rather than just ignoring them
+            if cancel:
+                cancel()
+            await deltas.aclose()
+            stream_stopped_at = time.perf_counter()
+
+        # Let the outstanding checks finish, then check any text they didn't cover
+        while in_flight and not trip:
+            await asyncio.wait([c.task for c in in_flight], return_when=asyncio.FIRST_COMPLETED)
+            collect_finished_checks()
+        if not trip and (checked_upto < len(current_text) or not checks_started):
+            start_check()
+            await asyncio.wait([in_flight[-1].task])
+            collect_finished_checks()
+    finally:
+        # Don't spend any more guardrail tokens on checks whose verdict no longer matters
+        for outstanding in in_flight:
+            if not outstanding.task.done():
+                outstanding.task.cancel()
+                checks_cancelled += 1
+
+    tripped_check, guardrail_result, verdict_at = trip or (None, None, None)
 
-    # Print a newline after the streamed response
-    print()
-    
     return {
         "response": current_text,
-        "guardrail_triggered": guardrail_triggered,
-        "guardrail_reason": guardrail_reason,
-        "guardrail_triggered_at": guardrail_triggered_at,
-        "guardrail_evaluated_text_length": guardrail_triggered_at if guardrail_triggered else None,
+        "guardrail_triggered": trip is not None,
+        "guardrail_reason": guardrail_result.reasoning if trip else "",
+        "guardrail_triggered_at": tripped_check.end if trip else None,  # Use when check started, not when it completed
+        "guardrail_evaluated_text_length": tripped_check.end if trip else None,
         "characters_checked_at_interval": check_interval,
-        "total_characters": len(current_text)
+        "total_characters": len(current_text),
+        "guardrail_mode": mode,
+        "guardrail_checks": checks_started,
+        "guardrail_checks_cancelled": checks_cancelled,
+        "guardrail_input_characters": guardrail_input_chars,
+        # Time from the earliest text only the tripped check covered arriving on the stream to the verdict
+        "time_to_verdict_ms": (verdict_at - arrived_at(tripped_check.unchecked_from)) * 1000 if trip else None,
+        "verdict_at_ms": (verdict_at - stream_started_at) * 1000 if trip else None,
+        "max_check_latency_ms": max(check_latencies_ms) if check_latencies_ms else None,
+        "generation_cancelled": stopped_early,
+        "stream_stopped_at_ms": (stream_stopped_at - stream_started_at) * 1000 if stopped_early else None,
     }
 
 
+async def process_prompt(
+    question: str, check_interval: int = 30, mode: str = "full", max_concurrent_checks: int = 1
+):
+    result = Runner.run_streamed(agent, question)
+
+    guardrail_info = await guard_stream(
+        stream_text(result),
+        check_interval=check_interval,
+        mode=mode,
+        max_concurrent_checks=max_concurrent_checks,
+        # Stream the chunk to stdout immediately
+        on_delta=lambda delta: print(delta, end="", flush=True),
+        cancel=result.cancel,
+    )
+
+    # Print a newline after the streamed response
+    print()
+
+    return guardrail_info
+
+
 if __name__ == "__main__":
-    # Get the prompt and check interval from command line
+    # Get the prompt, check interval, checking mode and concurrency from command line
     prompt = sys.argv[1] if len(sys.argv) > 1 else ""
     check_interval = int(sys.argv[2]) if len(sys.argv) > 2 else 30
-    
-    result = asyncio.run(process_prompt(prompt, check_interval))
-    
+    mode = sys.argv[3] if len(sys.argv) > 3 else "full"
+    max_concurrent_checks = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+
+    result = asyncio.run(process_prompt(prompt, check_interval, mode, max_concurrent_checks))
+
     # Print guardrail information as JSON
-    print(json.dumps(result))
\ No newline at end of file
+    print(json.dumps(result))
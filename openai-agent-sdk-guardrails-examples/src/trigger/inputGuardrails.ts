@@ -15,6 +15,8 @@ export const inputGuardrailsTask = task({
     return {
       response: parsedResponse.response,
       guardrailTriggered: parsedResponse.guardrail_triggered,
+      guardrailTier: parsedResponse.guardrail_tier,
+      guardrailLatencyMs: parsedResponse.guardrail_latency_ms,
     };
   },
 });
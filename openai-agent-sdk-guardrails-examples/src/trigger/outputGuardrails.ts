@@ -3,10 +3,10 @@ import { python } from "@trigger.dev/python";
 
 export const outputGuardrailsTask = task({
   id: "output-guardrails",
-  run: async (payload: { prompt: string }) => {
+  run: async (payload: { prompt: string; mode?: "final" | "partial" }) => {
     const result = await python.runScript(
       "./src/python/output-guardrails.py",
-      [payload.prompt],
+      [payload.prompt, payload.mode || "final"],
     );
 
     // The Python script will return JSON with response and whether the guardrail was triggered
@@ -16,6 +16,8 @@ export const outputGuardrailsTask = task({
       mathBotResponse: parsedResponse.math_analysis,
       response: parsedResponse.response,
       guardrailTriggered: parsedResponse.guardrail_triggered,
+      guardrailMode: parsedResponse.guardrail_mode,
+      wallTimeMs: parsedResponse.wall_time_ms,
     };
   },
 });
@@ -1,16 +1,30 @@
 import { logger, task } from "@trigger.dev/sdk";
 import { python } from "@trigger.dev/python";
 
-// This task takes a prompt and character check interval
-// Example: { "prompt": "What is a black hole?", "characterCheckInterval": 200 }
+// This task takes a prompt, character check interval and optionally the guardrail checking mode
+// Example: { "prompt": "What is a black hole?", "characterCheckInterval": 200, "mode": "incremental", "maxConcurrentChecks": 3 }
 export const streamingGuardrailsTask = task({
   id: "streaming-guardrails",
-  run: async (payload: { prompt: string; characterCheckInterval?: number }) => {
+  run: async (
+    payload: {
+      prompt: string;
+      characterCheckInterval?: number;
+      mode?: "full" | "incremental";
+      maxConcurrentChecks?: number;
+    },
+  ) => {
     const checkInterval = payload.characterCheckInterval || 30;
+    const mode = payload.mode || "full";
+    const maxConcurrentChecks = payload.maxConcurrentChecks || 1;
 
     const result = python.stream.runScript(
       "./src/python/streaming-guardrails.py",
-      [payload.prompt, checkInterval.toString()],
+      [
+        payload.prompt,
+        checkInterval.toString(),
+        mode,
+        maxConcurrentChecks.toString(),
+      ],
     );
 
     let output = "";
@@ -33,6 +47,12 @@ export const streamingGuardrailsTask = task({
       charactersCheckedAtInterval:
         parsedResponse.characters_checked_at_interval,
       totalCharacters: parsedResponse.total_characters,
+      guardrailMode: parsedResponse.guardrail_mode,
+      guardrailChecks: parsedResponse.guardrail_checks,
+      guardrailChecksCancelled: parsedResponse.guardrail_checks_cancelled,
+      guardrailInputCharacters: parsedResponse.guardrail_input_characters,
+      timeToVerdictMs: parsedResponse.time_to_verdict_ms,
+      generationCancelled: parsedResponse.generation_cancelled,
     };
   },
 });
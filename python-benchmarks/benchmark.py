@@ -0,0 +1,454 @@
+"""Benchmark and profile the core functions of the Python task scripts in this repo.
+
+  python benchmark.py [--suites image,pdf] [--items 20] [--output results.json]
+  python benchmark.py --save-baseline baseline.json
+  python benchmark.py --baseline baseline.json [--threshold 0.2]
+  python benchmark.py --suites image --profile profiles/
+
+Every suite runs in its own Python process against a generated fixture corpus, and reports:
+- the cold-start import time of the script (including its dependencies)
+- per-item latency percentiles and throughput of the script's core function
+- the peak RSS of the suite process
+
+With --profile, the hot loop of each suite is run under cProfile; the stats are written to
+<dir>/<suite>.prof and the top functions are included in the results (profiling adds overhead, so
+profiled runs can't be used as or compared with a baseline). With --baseline, the results
+are compared against a stored run and regressions beyond --threshold are flagged (exit code 1), as
+are requested suites that were ok in the baseline but errored, were skipped or produced no result.
+Suites whose dependencies aren't installed are skipped, and suites that fail for any other reason
+are reported as errors.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import http.server
+import importlib.util
+import inspect
+import io
+import json
+import os
+import pstats
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUARDRAILS_DIR = os.path.join(REPO_ROOT, "openai-agent-sdk-guardrails-examples", "src", "python")
+
+
+def load_script(path: str):
+    # The script names have dashes in them, so they can't be imported with a regular import statement
+    name = os.path.basename(path)[:-3].replace("-", "_")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@dataclass
+class Suite:
+    script: str  # Path of the script, relative to the repo root
+    make_fixtures: Callable[[Any, str, int], list]  # (module, workdir, items) -> fixtures
+    run: Callable[[Any, Any], Any]  # (module, fixture) -> result, or an awaitable
+
+
+### 1. Fixture corpora and core function calls for each script
+def image_fixtures(module, workdir: str, items: int) -> list[bytes]:
+    from PIL import Image
+
+    fixtures = []
+    for i in range(items):
+        width, height = random.choice([(640, 480), (1280, 960), (1920, 1080)])
+        img = Image.effect_noise((width, height), 64).convert("RGB")
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG" if i % 2 else "PNG")
+        fixtures.append(buffer.getvalue())
+    return fixtures
+
+
+def image_run(module, image_data: bytes):
+    return module.ImageProcessor.process_image(
+        image_data, width=800, height=600, quality=85, output_format="WEBP", sharpness=1.2
+    )
+
+
+def pdf_fixtures(module, workdir: str, items: int) -> list[str]:
+    fitz = module.fitz
+    fixtures = []
+    for i in range(items):
+        doc = fitz.open()
+        for page_num in range(3):
+            page = doc.new_page()
+            for field_num in range(10):
+                widget = fitz.Widget()
+                widget.rect = fitz.Rect(50, 50 + field_num * 40, 300, 75 + field_num * 40)
+                widget.field_name = f"field_{page_num}_{field_num}"
+                if field_num % 3 == 0:
+                    widget.field_type = fitz.PDF_WIDGET_TYPE_CHECKBOX
+                    widget.field_value = field_num % 2 == 0
+                else:
+                    widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+                    widget.field_value = f"Value {i}-{page_num}-{field_num}"
+                page.add_widget(widget)
+        path = os.path.join(workdir, f"form-{i}.pdf")
+        doc.save(path)
+        doc.close()
+        fixtures.append(path)
+    return fixtures
+
+
+def pdf_run(module, pdf_path: str):
+    return module.extract_form_data(pdf_path)
+
+
+def html_page(i: int) -> str:
+    paragraphs = "".join(
+        f"<h2>Section {j}</h2><p>Paragraph {j} of page {i} with a <a href='/page-{j}.html'>link</a>.</p>"
+        f"<ul>{''.join(f'<li>Item {k}</li>' for k in range(5))}</ul>"
+        for j in range(20)
+    )
+    return f"<html><head><title>Page {i}</title></head><body><h1>Page {i}</h1>{paragraphs}</body></html>"
+
+
+def markdown_fixtures(module, workdir: str, items: int) -> list[str]:
+    fixtures = []
+    for i in range(items):
+        if i % 2:
+            path = os.path.join(workdir, f"doc-{i}.csv")
+            rows = ["id,name,amount"] + [f"{row},Name {row},{row * 1.5}" for row in range(200)]
+            content = "\n".join(rows)
+        else:
+            path = os.path.join(workdir, f"doc-{i}.html")
+            content = html_page(i)
+        with open(path, "w") as f:
+            f.write(content)
+        fixtures.append(path)
+    return fixtures
+
+
+def markdown_run(module, file_path: str):
+    return module.convert_to_markdown(file_path)
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def crawl_fixtures(module, workdir: str, items: int) -> list[str]:
+    for i in range(items):
+        with open(os.path.join(workdir, f"page-{i}.html"), "w") as f:
+            f.write(html_page(i))
+    # Serve the pages locally so the crawler doesn't depend on the network
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory=workdir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return [f"http://127.0.0.1:{server.server_port}/page-{i}.html" for i in range(items)]
+
+
+async def crawl_run(module, url: str):
+    # crawl-url.py prints the markdown, which would drown out the results
+    with contextlib.redirect_stdout(io.StringIO()):
+        await module.main(url)
+
+
+def use_stub_guardrail_model(module, *agent_names: str, verdict: Callable[[str], bool] | None = None):
+    """Point the script's guardrail agents at the local stub model, so the benchmark measures the
+    guardrail code rather than the model.
+    """
+    # Imported here so that only the guardrail suites need the agents SDK
+    from agents import set_tracing_disabled
+    from stub_guardrail_model import StubGuardrailModel
+
+    set_tracing_disabled(True)
+    model = StubGuardrailModel(verdict=verdict)
+    for name in agent_names:
+        setattr(module, name, getattr(module, name).clone(model=model))
+
+
+GUARDRAIL_PROMPTS = [
+    "solve 2x+3=7",
+    "what's the weather",
+    "Why does dividing by zero not work?",
+    "How many ways can 5 people sit in a row?",
+    "Tell me about the Roman Empire",
+    "What is the derivative of x^2 + 3x?",
+]
+
+
+def input_guardrail_fixtures(module, workdir: str, items: int) -> list[str]:
+    use_stub_guardrail_model(module, "guardrail_agent")
+    return [random.choice(GUARDRAIL_PROMPTS) for _ in range(items)]
+
+
+async def input_guardrail_run(module, prompt: str):
+    return await module.non_math_guardrail.guardrail_function(module.RunContextWrapper(None), None, prompt)
+
+
+def output_guardrail_fixtures(module, workdir: str, items: int) -> list:
+    use_stub_guardrail_model(module, "guardrail_agent")
+    responses = ["x = 2, because 2 * 2 + 3 = 7.", "Paris is the capital of France.", "There are 120 ways."]
+    return [module.MessageOutput(response=random.choice(responses)) for _ in range(items)]
+
+
+async def output_guardrail_run(module, output):
+    return await module.math_guardrail.guardrail_function(module.RunContextWrapper(None), module.agent, output)
+
+
+def streaming_guardrail_fixtures(module, workdir: str, items: int) -> list[list[str]]:
+    # Every chunk passes, so each item streams the whole response through the guardrail
+    use_stub_guardrail_model(module, "guardrail_agent", "incremental_guardrail_agent", verdict=lambda text: True)
+    words = "the sun is big and warm so plants grow tall and green in the spring".split()
+    return [[random.choice(words) + " " for _ in range(400)] for _ in range(items)]
+
+
+async def streaming_guardrail_run(module, chunks: list[str]):
+    async def deltas():
+        for chunk in chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    return await module.guard_stream(
+        deltas(), check_interval=100, mode="incremental", max_concurrent_checks=3, character_limit=10**6
+    )
+
+
+SUITES = {
+    "image": Suite("python-image-processing/src/python/image-processing.py", image_fixtures, image_run),
+    "pdf": Suite("python-pdf-form-extractor/src/python/extract-pdf-form.py", pdf_fixtures, pdf_run),
+    "markdown": Suite("python-doc-to-markdown-converter/src/python/markdown-converter.py", markdown_fixtures, markdown_run),
+    "crawl": Suite("python-crawl4ai/src/python/crawl-url.py", crawl_fixtures, crawl_run),
+    "input-guardrail": Suite(
+        "openai-agent-sdk-guardrails-examples/src/python/input-guardrails.py", input_guardrail_fixtures, input_guardrail_run
+    ),
+    "output-guardrail": Suite(
+        "openai-agent-sdk-guardrails-examples/src/python/output-guardrails.py", output_guardrail_fixtures, output_guardrail_run
+    ),
+    "streaming-guardrail": Suite(
+        "openai-agent-sdk-guardrails-examples/src/python/streaming-guardrails.py",
+        streaming_guardrail_fixtures,
+        streaming_guardrail_run,
+    ),
+}
+
+
+### 2. Running a single suite (in its own process)
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_suite(name: str, items: int, warmup: int, profile_dir: str | None, seed: int) -> dict:
+    suite = SUITES[name]
+    random.seed(seed)
+
+    started_at = time.perf_counter()
+    try:
+        module = load_script(os.path.join(REPO_ROOT, suite.script))
+    except ImportError as e:
+        return {"status": "skipped", "reason": f"Missing dependency: {e}"}
+    import_s = time.perf_counter() - started_at
+
+    loop = asyncio.new_event_loop()
+
+    def call(fixture):
+        result = suite.run(module, fixture)
+        if inspect.isawaitable(result):
+            result = loop.run_until_complete(result)
+        return result
+
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            fixtures = suite.make_fixtures(module, workdir, items + warmup)
+            for fixture in fixtures[:warmup]:
+                call(fixture)
+        except ImportError as e:
+            # The fixtures or the warmup can need a dependency the script only imports lazily
+            return {"status": "skipped", "reason": f"Missing dependency: {e}", "import_s": import_s}
+        except Exception as e:
+            return {"status": "error", "reason": f"{type(e).__name__}: {e}", "import_s": import_s}
+
+        profiler = cProfile.Profile() if profile_dir else None
+        latencies_ms = []
+        loop_started_at = time.perf_counter()
+        for fixture in fixtures[warmup:]:
+            item_started_at = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            call(fixture)
+            if profiler:
+                profiler.disable()
+            latencies_ms.append((time.perf_counter() - item_started_at) * 1000)
+        loop_s = time.perf_counter() - loop_started_at
+
+    result = {
+        "status": "ok",
+        "import_s": import_s,
+        "items": len(latencies_ms),
+        "latency_ms": {
+            "p50": percentile(latencies_ms, 50),
+            "p95": percentile(latencies_ms, 95),
+            "p99": percentile(latencies_ms, 99),
+            "mean": statistics.mean(latencies_ms),
+        },
+        "throughput_items_per_s": len(latencies_ms) / loop_s,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    if profiler:
+        os.makedirs(profile_dir, exist_ok=True)
+        profile_path = os.path.join(profile_dir, f"{name}.prof")
+        profiler.dump_stats(profile_path)
+        output = io.StringIO()
+        pstats.Stats(profiler, stream=output).sort_stats("cumulative").print_stats(15)
+        result["profile"] = profile_path
+        result["profile_top"] = output.getvalue()
+
+    return result
+
+
+### 3. Running all suites and comparing against a baseline
+# (metric, worse when it goes up, smallest absolute change worth flagging)
+COMPARED_METRICS = [
+    ("import_s", True, 0.02),
+    ("latency_ms.p50", True, 0.1),
+    ("latency_ms.p95", True, 0.1),
+    ("throughput_items_per_s", False, 0.0),
+    ("peak_rss_mb", True, 5.0),
+]
+
+
+def get_metric(result: dict, metric: str):
+    value = result
+    for key in metric.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(results: dict, baseline: dict, threshold: float, names: list[str]) -> list[dict]:
+    regressions = []
+    # A requested suite that ran in the baseline but didn't run now (errored, got skipped or produced
+    # no result) can hide any slowdown, so it counts as a regression too. Baseline suites that weren't
+    # requested with --suites are left out on purpose
+    for name in names:
+        previous = baseline.get(name)
+        status = results.get(name, {}).get("status", "missing")
+        if previous and previous.get("status") == "ok" and status != "ok":
+            regressions.append({
+                "suite": name,
+                "metric": "status",
+                "baseline": "ok",
+                "current": status,
+                "reason": results.get(name, {}).get("reason", "No result"),
+            })
+
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if result.get("status") != "ok" or not previous or previous.get("status") != "ok":
+            continue
+        for metric, higher_is_worse, min_delta in COMPARED_METRICS:
+            current, before = get_metric(result, metric), get_metric(previous, metric)
+            if current is None or not before:
+                continue
+            change = (current - before) / before
+            worse = change > threshold if higher_is_worse else change < -threshold
+            if worse and abs(current - before) >= min_delta:
+                regressions.append({
+                    "suite": name,
+                    "metric": metric,
+                    "baseline": before,
+                    "current": current,
+                    "change_pct": change * 100,
+                })
+    return regressions
+
+
+def run_in_subprocess(name: str, args) -> dict:
+    command = [
+        args.python, os.path.abspath(__file__), "--child", name,
+        "--items", str(args.items), "--warmup", str(args.warmup), "--seed", str(args.seed),
+    ]
+    if args.profile:
+        command += ["--profile", os.path.abspath(args.profile)]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {"status": "error", "reason": (completed.stderr.strip().splitlines() or ["Unknown error"])[-1]}
+    # The suite result is the last line, anything the script itself printed comes before it
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(args):
+    if args.child:
+        print(json.dumps(run_suite(args.child, args.items, args.warmup, args.profile, args.seed)))
+        return 0
+
+    names = args.suites.split(",") if args.suites else list(SUITES)
+    unknown = [name for name in names if name not in SUITES]
+    if unknown:
+        print(json.dumps({"error": f"Unknown suites: {', '.join(unknown)}", "suites": list(SUITES)}), file=sys.stderr)
+        return 1
+
+    results = {}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        results[name] = run_in_subprocess(name, args)
+
+    report = {"results": results}
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(results, json.load(f), args.threshold, names)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    for regression in report.get("regressions", []):
+        if regression["metric"] == "status":
+            print(f"REGRESSION {regression['suite']}: ok -> {regression['current']} ({regression['reason']})", file=sys.stderr)
+            continue
+        print(
+            f"REGRESSION {regression['suite']} {regression['metric']}: "
+            f"{regression['baseline']:.3f} -> {regression['current']:.3f} ({regression['change_pct']:+.1f}%)",
+            file=sys.stderr,
+        )
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", help=f"Comma separated suites to run (default: all of {', '.join(SUITES)})")
+    parser.add_argument("--items", type=int, default=20, help="Fixtures per suite")
+    parser.add_argument("--warmup", type=int, default=2, help="Extra fixtures run before timing starts")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the fixture corpora")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results stored with --save-baseline")
+    parser.add_argument("--save-baseline", help="Store the results as a baseline in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative change that counts as a regression")
+    parser.add_argument("--profile", help="Capture cProfile stats of each suite's hot loop into this directory")
+    parser.add_argument("--python", default=sys.executable, help="Python interpreter to run the suites with")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.profile and (args.baseline or args.save_baseline):
+        parser.error("profiling slows the suites down, so profiled runs can't be compared with a baseline")
+    sys.exit(main(args))
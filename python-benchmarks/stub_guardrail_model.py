@@ -0,0 +1,65 @@
+"""A local stand-in for the model behind the guardrail agents, used by the guardrail suites of
+benchmark.py so they measure the guardrail code rather than the OpenAI API.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Callable
+
+from openai.types.responses import ResponseOutputMessage, ResponseOutputText
+
+from agents import ModelResponse, Usage
+from agents.models.interface import Model
+
+MATH_PATTERN = re.compile(
+    r"\d|[=+^±]|\b(equation|formula|solve|algebra|calculus|derivative|integral|geometry|fraction|probability)\b",
+    re.IGNORECASE,
+)
+
+
+def input_to_text(input) -> str:
+    """Flatten the model input into the text of its messages."""
+    if isinstance(input, str):
+        return input
+    parts = []
+    for item in input:
+        content = item.get("content") if isinstance(item, dict) else None
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(part.get("text", "") for part in content if isinstance(part, dict))
+    return "\n".join(parts)
+
+
+class StubGuardrailModel(Model):
+    """Answers guardrail calls straight away. By default text is marked as math if it matches a regex;
+    pass `verdict` to decide the boolean field of the output some other way.
+    """
+
+    def __init__(self, verdict: Callable[[str], bool] | None = None):
+        self.verdict = verdict or (lambda text: bool(MATH_PATTERN.search(text)))
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs):
+        text = input_to_text(input)
+        # Fill in the output type's fields: the verdict for booleans, "stub" for everything else
+        properties = output_schema.json_schema()["properties"]
+        output_text = json.dumps({
+            name: self.verdict(text) if spec.get("type") == "boolean" else "stub"
+            for name, spec in properties.items()
+        })
+        return ModelResponse(
+            output=[ResponseOutputMessage(
+                id="stub",
+                type="message",
+                role="assistant",
+                status="completed",
+                content=[ResponseOutputText(type="output_text", text=output_text, annotations=[])],
+            )],
+            usage=Usage(requests=1, input_tokens=len(text) // 4, output_tokens=len(output_text) // 4),
+            response_id=None,
+        )
+
+    def stream_response(self, *args, **kwargs):
+        raise NotImplementedError("The stub model doesn't support streaming")